@@ -1,16 +1,37 @@
 import fitz
-import json
+import orjson
+import os
 import re
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from multiprocessing import Pool
 from pathlib import Path
 from collections import Counter, defaultdict
 import numpy as np
 from tqdm import tqdm
 from scipy import stats
-from langdetect import detect, DetectorFactory
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
 
 # Initialize language detector with fixed seed for consistency
 DetectorFactory.seed = 0
 
+# Only the languages covered by MULTI_NUMBERED and MULTI_KEYWORDS are loaded;
+# langdetect reports Chinese as zh-cn / zh-tw
+DETECTED_LANGUAGES = ('en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'ar', 'zh-cn', 'zh-tw', 'ja', 'ko', 'hi')
+
+def _load_detector_factory(languages):
+    profiles = [
+        (Path(PROFILES_DIRECTORY) / lang).read_text(encoding='utf-8')
+        for lang in languages
+    ]
+    factory = DetectorFactory()
+    factory.load_json_profile(profiles)
+    return factory
+
+# Load the language profiles once and reuse the factory for every detection
+_detector_factory = _load_detector_factory(DETECTED_LANGUAGES)
+
 # Multilingual patterns and keywords
 MULTI_NUMBERED = {
     'en': [r'^\d+(\.\d+)*[\.\-]?\s*', r'^Chapter\s+\d+', r'^Section\s+\d+'],
@@ -27,6 +48,30 @@ MULTI_NUMBERED = {
     'hi': [r'^[\u0900-\u097F]+\s+\d+', r'^अध्याय\s+\d+'],
 }
 
+def _alternation(patterns):
+    """Compile several patterns into one case-insensitive alternation"""
+    return re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE)
+
+# Generic numbering patterns (1., 1.2, A., IV.) tried for every language
+FALLBACK_NUMBERED = [
+    r'^(\d+\.?\s+)',
+    r'^(\d+\.\d+\.?\s+)',
+    r'^(\d+\.\d+\.\d+\.?\s+)',
+    r'^([A-Z]\.?\s+)',
+    r'^([IVX]+\.?\s+)',
+]
+
+# One regex per language covering its own numbering patterns, the English ones
+# and the generic fallbacks, so each span needs a single match call
+MERGED_NUMBERED_RE = {
+    lang: _alternation(
+        patterns + (MULTI_NUMBERED['en'] if lang != 'en' else []) + FALLBACK_NUMBERED
+    )
+    for lang, patterns in MULTI_NUMBERED.items()
+}
+
+NUMBERING_PREFIX_RE = re.compile(r'^(\d+(\.\d+)*)(\s+|\.|-)')
+
 MULTI_KEYWORDS = {
     'en': ['introduction', 'summary', 'table of contents', 'references', 'acknowledgements', 
            'abstract', 'conclusion', 'overview', 'background', 'methodology', 'results', 
@@ -50,62 +95,180 @@ MULTI_KEYWORDS = {
     'hi': ['परिचय', 'सारांश', 'अनुक्रमणिका', 'निष्कर्ष', 'संदर्भ', 'पृष्ठभूमि', 'विधि'],
 }
 
-# Function to clean text for heading detection
+# One regex per language searching lowercased text for its own keywords and the
+# English ones in a single scan
+KEYWORD_RE = {
+    lang: re.compile('|'.join(
+        re.escape(k) for k in keywords + (MULTI_KEYWORDS['en'] if lang != 'en' else [])
+    ))
+    for lang, keywords in MULTI_KEYWORDS.items()
+}
+
+# Function to clean text for heading detection; the result is already stripped
 def clean_text(t):
     return t.strip().replace('\n', ' ').replace('\r', '')
 
-# Utility to parse numbering prefix like "2.1.3" and return level depth (e.g., 3)
-def numbering_prefix_level(text):
-    m = re.match(r'^(\d+(\.\d+)*)(\s+|\.|-)', text.strip())
+# Numbering prefixes longer than this are not recognized; keeping the cache key
+# short lets headings that share a prefix ("1.", "2.1 ") share a cache entry
+NUMBERING_PREFIX_CHARS = 16
+
+@lru_cache(maxsize=8192)
+def _numbering_prefix_level(prefix):
+    m = NUMBERING_PREFIX_RE.match(prefix)
     if m:
         return m.group(1).count('.') + 1  # Count dots + 1 = depth
     return None
 
+# Utility to parse numbering prefix like "2.1.3" and return level depth (e.g., 3)
+def numbering_prefix_level(text):
+    return _numbering_prefix_level(text[:NUMBERING_PREFIX_CHARS])
+
+@dataclass
+class Spans:
+    """Text spans of a document stored column-wise, one array per attribute"""
+    text: list  # cleaned and stripped
+    lower: list  # text.lower(), computed once at extraction
+    length: np.ndarray
+    script: np.ndarray  # index into SCRIPT_NAMES, from the first character
+    font_size: np.ndarray  # float64, the same values used as font_level_map keys
+    bold: np.ndarray
+    italic: np.ndarray
+    page: np.ndarray
+    bbox: np.ndarray  # (N, 4): x0, y0, x1, y1
+
+    def __len__(self):
+        return len(self.text)
+
+    @property
+    def x_pos(self):
+        return self.bbox[:, 0]
+
+    @property
+    def y_pos(self):
+        return self.bbox[:, 1]
+
+    def take(self, indices):
+        """Return the spans at the given indices"""
+        return Spans(
+            text=[self.text[i] for i in indices],
+            lower=[self.lower[i] for i in indices],
+            length=self.length[indices],
+            script=self.script[indices],
+            font_size=self.font_size[indices],
+            bold=self.bold[indices],
+            italic=self.italic[indices],
+            page=self.page[indices],
+            bbox=self.bbox[indices],
+        )
+
+@dataclass(slots=True)
+class Heading:
+    """A span selected as a heading"""
+    text: str
+    lower: str
+    level: int
+    page: int
+    score: int
+    y_pos: float
+    lang: str = "unknown"
+
+@dataclass
+class ExtractedText:
+    """Result of the single extraction pass over a PDF"""
+    candidates: Spans  # spans that may be headings
+    font_sizes: np.ndarray  # distinct font sizes of all spans, ascending
+    font_counts: np.ndarray  # number of spans in each of font_sizes
+    texts_by_size: dict  # font size -> texts of all spans in that size
+
+# "dict" extraction without image blocks (their pixel data is copied into the
+# result) and with ligatures expanded to plain characters
+TEXT_EXTRACT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES & ~fitz.TEXT_PRESERVE_LIGATURES
+
+def iter_text_spans(pdf_path):
+    """Yield (text, font_size, flags, page, bbox) for every non-empty text span"""
+    with fitz.open(pdf_path) as doc:
+        for page_num, page in enumerate(doc, start=1):
+            blocks = page.get_text("dict", flags=TEXT_EXTRACT_FLAGS)["blocks"]
+            for block in blocks:
+                if block["type"] != 0:
+                    continue  # skip images/graphics
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        text = clean_text(span["text"])
+                        if not text:
+                            continue
+                        yield text, span["size"], span.get("flags", 0), page_num, span["bbox"]
+
 def extract_text_spans(pdf_path):
-    doc = fitz.open(pdf_path)
-    spans = []
-    for page_num, page in enumerate(doc, start=1):
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            if block["type"] != 0:
-                continue  # skip images/graphics
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    text = clean_text(span["text"])
-                    if not text:
-                        continue
-                    spans.append({
-                        "text": text,
-                        "font_size": span["size"],
-                        "bold": bool(span.get("flags", 0) & 2),
-                        "italic": bool(span.get("flags", 0) & 1),
-                        "page": page_num,
-                        "bbox": span["bbox"],
-                        "y_pos": span["bbox"][1],
-                        "x_pos": span["bbox"][0],
-                        "origin": (page_num, block, line),
-                    })
-    doc.close()
-    return spans
-
-def analyze_font_hierarchy_statistical(spans):
     """
-    Use statistical analysis instead of K-means for more robust font size classification
+    Collect the font size histogram of all spans and the heading candidates in one pass,
+    so non-candidate spans are never stored column-wise
     """
-    font_sizes = [span["font_size"] for span in spans]
-    font_counter = Counter(font_sizes)
-    
-    # Get font sizes sorted by frequency (most common first)
-    common_sizes = font_counter.most_common()
-    
-    if len(common_sizes) <= 1:
-        return {common_sizes[0][0]: 1} if common_sizes else {}
+    font_counter = Counter()
+    texts_by_size = defaultdict(list)
+    texts, lowers, font_sizes, flags, pages, bboxes = [], [], [], [], [], []
+    for text, size, span_flags, page_num, bbox in iter_text_spans(pdf_path):
+        font_counter[size] += 1
+        texts_by_size[size].append(text)
+        
+        if len(text) < 2 or len(text) > 200:
+            continue
+        if not is_heading_candidate(text):
+            continue
+        
+        texts.append(text)
+        lowers.append(text.lower())
+        font_sizes.append(size)
+        flags.append(span_flags)
+        pages.append(page_num)
+        bboxes.append(bbox)
+    
+    flags = np.array(flags, dtype=np.int32)
+    candidates = Spans(
+        text=texts,
+        lower=lowers,
+        length=np.fromiter(map(len, texts), dtype=np.int32, count=len(texts)),
+        script=script_ids(texts),
+        font_size=np.array(font_sizes, dtype=np.float64),
+        bold=(flags & 2).astype(bool),
+        italic=(flags & 1).astype(bool),
+        page=np.array(pages, dtype=np.int32),
+        bbox=np.array(bboxes, dtype=np.float32).reshape(-1, 4),
+    )
+    sizes = sorted(font_counter)
+    return ExtractedText(
+        candidates=candidates,
+        font_sizes=np.array(sizes, dtype=np.float64),
+        font_counts=np.array([font_counter[size] for size in sizes], dtype=np.int64),
+        texts_by_size=texts_by_size,
+    )
+
+def weighted_percentile(values, counts, q):
+    """
+    np.percentile (linear method) of ascending values repeated counts times,
+    computed without materializing the repeated array
+    """
+    cumulative = np.cumsum(counts)
+    last = cumulative[-1] - 1
+    position = last * (np.asarray(q, dtype=np.float64) / 100)
+    below_index = np.floor(position).astype(np.int64)
+    fraction = position - below_index
+    below = values[np.searchsorted(cumulative, below_index, side='right')]
+    above = values[np.searchsorted(cumulative, np.minimum(below_index + 1, last), side='right')]
+    # Same interpolation as NumPy, so thresholds are bit-identical
+    diff = above - below
+    return np.where(fraction >= 0.5, above - diff * (1 - fraction), below + diff * fraction)
+
+def analyze_font_hierarchy_statistical(unique_sizes, counts):
+    """
+    Use statistical analysis instead of K-means for more robust font size classification.
+    Works on the font size histogram: ascending distinct sizes and their span counts
+    """
+    if len(unique_sizes) <= 1:
+        return {unique_sizes[0].item(): 1} if len(unique_sizes) else {}
     
     # Statistical approach: use percentiles and outlier detection
-    font_array = np.array(font_sizes)
-    
-    # Calculate percentiles
-    percentiles = np.percentile(font_array, [25, 50, 75, 90, 95])
+    percentiles = weighted_percentile(unique_sizes, counts, [25, 50, 75, 90, 95])
     q25, median, q75, p90, p95 = percentiles
     
     # Identify potential heading sizes using statistical thresholds
@@ -127,143 +290,190 @@ def analyze_font_hierarchy_statistical(spans):
     if median < q75:
         heading_thresholds.append(("H4", median + 0.5, q75))
     
-    # Create font size to level mapping
-    font_level_map = {}
-    
-    # First, assign body text level (most common size gets level 5)
-    most_common_size = common_sizes[0][0]
+    # Create font size to level mapping, with every size defaulting to body text level 5
     default_level = 5
-    
-    for size in font_counter.keys():
-        font_level_map[size] = default_level
+    font_level_map = dict.fromkeys(unique_sizes.tolist(), default_level)
     
     # Then assign heading levels based on thresholds
     level_counter = 1
     for label, min_size, max_size in sorted(heading_thresholds, key=lambda x: -x[1]):
-        for size in font_counter.keys():
-            if min_size <= size < max_size:
-                font_level_map[size] = level_counter
+        in_range = (unique_sizes >= min_size) & (unique_sizes < max_size)
+        for size in unique_sizes[in_range].tolist():
+            font_level_map[size] = level_counter
         level_counter += 1
     
     return font_level_map
 
+def lookup_font_levels(font_sizes, font_level_map, default_level=5):
+    """Vectorized font_level_map lookup, sizes missing from the map get default_level"""
+    if not font_level_map:
+        return np.full(len(font_sizes), default_level)
+    sizes = np.fromiter(font_level_map.keys(), dtype=np.float64, count=len(font_level_map))
+    levels = np.fromiter(font_level_map.values(), dtype=np.int64, count=len(font_level_map))
+    order = np.argsort(sizes)
+    sizes, levels = sizes[order], levels[order]
+    idx = np.minimum(np.searchsorted(sizes, font_sizes), len(sizes) - 1)
+    return np.where(sizes[idx] == font_sizes, levels[idx], default_level)
+
+# Script of a code point, looked up in a table indexed by code point >> 4
+# (every range below starts and ends on a 16 code point boundary)
+SCRIPT_NAMES = ("unknown", "latin", "cyrillic", "arabic", "devanagari", "hiragana", "katakana", "cjk", "hangul")
+_SCRIPT_RANGES = [
+    ("cjk", 0x4E00, 0x9FFF),  # CJK Unified Ideographs
+    ("hiragana", 0x3040, 0x309F),
+    ("katakana", 0x30A0, 0x30FF),
+    ("hangul", 0xAC00, 0xD7AF),
+    ("arabic", 0x0600, 0x06FF),
+    ("devanagari", 0x0900, 0x097F),  # Hindi
+    ("cyrillic", 0x0400, 0x04FF),  # Russian, etc.
+    ("latin", 0x0020, 0x024F),  # Most European languages
+]
+_SCRIPT_LUT = np.zeros(0x110000 >> 4, dtype=np.uint8)
+for _name, _first, _last in _SCRIPT_RANGES:
+    _SCRIPT_LUT[_first >> 4:(_last >> 4) + 1] = SCRIPT_NAMES.index(_name)
+
 def detect_script_type(text):
     """Detect script type for multilingual bonus scoring"""
     if not text:
         return "unknown"
-    
-    first_char = ord(text[0])
-    
-    # CJK (Chinese, Japanese, Korean)
-    if 0x4E00 <= first_char <= 0x9FFF:  # CJK Unified Ideographs
-        return "cjk"
-    elif 0x3040 <= first_char <= 0x309F:  # Hiragana
-        return "hiragana"
-    elif 0x30A0 <= first_char <= 0x30FF:  # Katakana
-        return "katakana"
-    elif 0xAC00 <= first_char <= 0xD7AF:  # Hangul
-        return "hangul"
-    
-    # Arabic
-    elif 0x0600 <= first_char <= 0x06FF:
-        return "arabic"
-    
-    # Devanagari (Hindi)
-    elif 0x0900 <= first_char <= 0x097F:
-        return "devanagari"
-    
-    # Cyrillic (Russian, etc.)
-    elif 0x0400 <= first_char <= 0x04FF:
-        return "cyrillic"
-    
-    # Latin (most European languages)
-    elif 0x0020 <= first_char <= 0x024F:
-        return "latin"
-    
-    return "unknown"
+    return SCRIPT_NAMES[_SCRIPT_LUT[ord(text[0]) >> 4]]
+
+def script_ids(texts):
+    """Vectorized detect_script_type for non-empty texts, as indices into SCRIPT_NAMES"""
+    first_chars = np.fromiter((ord(text[0]) for text in texts), dtype=np.int32, count=len(texts))
+    return _SCRIPT_LUT[first_chars >> 4]
 
-def calculate_heading_probability(span, font_level_map, all_spans):
+def _detect(text):
+    try:
+        detector = _detector_factory.create()
+        detector.append(text)
+        return detector.detect()
+    except LangDetectException:
+        return "unknown"
+
+@lru_cache(maxsize=4096)
+def _detect_cached(text):
+    return _detect(text)
+
+def detect_language(text):
+    """Detect span language, memoized on the first 64 characters"""
+    return _detect_cached(text[:64])
+
+# The document language is voted on by this many body text chunks of this size,
+# taken from the start, middle and end, which bounds detection cost for long documents
+DOC_LANG_CHUNKS = 3
+DOC_LANG_CHUNK_CHARS = 700
+
+def detect_document_language(extracted):
     """
-    Calculate probability that a span is a heading using multiple features including multilingual support
+    Detect the dominant language and script of a document from its body text
+    (spans set in the most common font size)
     """
-    text = span["text"].strip()
-    score = 0
-    
-    # Detect language
-    try:
-        lang = detect(text)
-    except:
-        lang = "unknown"
-    
-    span["lang"] = lang
+    body_size = extracted.font_sizes[np.argmax(extracted.font_counts)].item()
+    body_text = " ".join(extracted.texts_by_size[body_size])
     
+    if len(body_text) <= DOC_LANG_CHUNKS * DOC_LANG_CHUNK_CHARS:
+        chunks = [body_text]
+    else:
+        starts = np.linspace(0, len(body_text) - DOC_LANG_CHUNK_CHARS, DOC_LANG_CHUNKS).astype(int)
+        chunks = [body_text[start:start + DOC_LANG_CHUNK_CHARS] for start in starts]
+    votes = Counter(_detect(chunk) for chunk in chunks)
+    return votes.most_common(1)[0][0], document_script(extracted.texts_by_size[body_size])
+
+def document_script(texts):
+    """
+    Majority script of the texts, ignoring those that start with a digit,
+    punctuation or a bullet, since those say nothing about the script
+    """
+    counts = np.bincount(
+        script_ids([text for text in texts if text[0].isalpha()]), minlength=len(SCRIPT_NAMES)
+    )
+    counts[SCRIPT_NAMES.index("unknown")] = 0
+    return SCRIPT_NAMES[np.argmax(counts)] if counts.any() else "unknown"
+
+# Latin-script languages an ASCII-only span may be written in
+ASCII_LANGUAGES = {'en', 'es', 'fr', 'de', 'it', 'pt'}
+
+def span_language(text, script, doc_lang, doc_script):
+    """Reuse the document language for spans in the document's script, detect otherwise"""
+    if doc_lang != "unknown" and script == doc_script:
+        return doc_lang
+    # ASCII-only spans skip langdetect: the document language if it can be
+    # written in ASCII, English otherwise
+    if text.isascii():
+        return doc_lang if doc_lang in ASCII_LANGUAGES else 'en'
+    return detect_language(text)
+
+# Scripts that earn the multilingual bonus in heading scoring
+NON_LATIN_SCRIPTS = {"cjk", "hiragana", "katakana", "hangul", "arabic", "devanagari", "cyrillic"}
+_NON_LATIN_SCRIPT_IDS = [SCRIPT_NAMES.index(name) for name in NON_LATIN_SCRIPTS]
+
+def heading_text_features(text, text_lower, lang):
+    """
+    Text-derived heading features: (numbering prefix, heading keyword, all caps)
+    """
+    numbered_re = MERGED_NUMBERED_RE.get(lang, MERGED_NUMBERED_RE['en'])
+    keyword_re = KEYWORD_RE.get(lang, KEYWORD_RE['en'])
+    return (
+        numbered_re.match(text) is not None,
+        keyword_re.search(text_lower) is not None,
+        text.isupper() and any(c.isalpha() for c in text),
+    )
+
+def score_heading_features(font_level, bold, numbered, keyword, length, all_caps, non_latin):
+    """
+    Heading score of every span from its feature arrays, as whole-array arithmetic
+    """
     # Font size score (40% of total score)
-    font_level = font_level_map.get(span["font_size"], 5)
-    font_score = max(0, 40 - (font_level - 1) * 8)  # H1=40, H2=32, H3=24
-    score += font_score
+    score = np.maximum(0, 40 - (font_level - 1) * 8)  # H1=40, H2=32, H3=24
     
     # Bold text bonus (15% of total score)
-    if span["bold"]:
-        score += 15
+    score += 15 * bold
     
     # Multilingual numbering pattern bonus (20% of total score)
-    numbered_patterns = MULTI_NUMBERED.get(lang, []) + MULTI_NUMBERED.get('en', [])
-    for pattern in numbered_patterns:
-        if re.match(pattern, text, re.IGNORECASE):
-            score += 20
-            break
-    
-    # Fallback English patterns if no language-specific match
-    if score == font_score + (15 if span["bold"] else 0):
-        fallback_patterns = [
-            r'^(\d+\.?\s+)',                     
-            r'^(\d+\.\d+\.?\s+)',              
-            r'^(\d+\.\d+\.\d+\.?\s+)',         
-            r'^([A-Z]\.?\s+)',                 
-            r'^([IVX]+\.?\s+)',                
-        ]
-        for pattern in fallback_patterns:
-            if re.match(pattern, text, re.IGNORECASE):
-                score += 20
-                break
+    score += 20 * numbered
     
     # Multilingual heading keywords (10% of total score)
-    text_lower = text.lower()
-    heading_keywords = MULTI_KEYWORDS.get(lang, []) + MULTI_KEYWORDS.get('en', [])
-    for keyword in heading_keywords:
-        if keyword in text_lower:
-            score += 10
-            break
+    score += 10 * keyword
     
     # Length penalty/bonus (10% of total score)
-    if 3 <= len(text) <= 100:
-        score += 10
-    elif len(text) > 150:
-        score -= 15
+    score += np.where((length >= 3) & (length <= 100), 10, np.where(length > 150, -15, 0))
     
     # All caps bonus for reasonable length (5% of total score)
-    if 5 <= len(text) <= 50 and text.isupper() and any(c.isalpha() for c in text):
-        score += 5
+    score += 5 * (all_caps & (length >= 5) & (length <= 50))
     
     # Script-based multilingual bonus for detection (10% of total score)
-    script_type = detect_script_type(text)
-    if script_type in ["cjk", "hiragana", "katakana", "hangul", "arabic", "devanagari", "cyrillic"]:
-        score += 10
+    score += 10 * non_latin
     
     return score
 
-def is_heading_candidate(span):
-    # Enhanced filtering with multilingual support
-    text = span["text"].strip()
-    
-    if len(text) < 2 or len(text) > 200:
-        return False
-    
+def calculate_heading_probability(spans, font_levels, langs):
+    """
+    Calculate probability that each span is a heading using multiple features including multilingual support
+    """
+    # Regex and string features need Python, but only one pass over the spans
+    features = np.array(
+        [heading_text_features(*args) for args in zip(spans.text, spans.lower, langs)], dtype=bool
+    ).reshape(-1, 3)
+    numbered, keyword, all_caps = features.T
+    non_latin = np.isin(spans.script, _NON_LATIN_SCRIPT_IDS)
+    
+    return score_heading_features(
+        font_levels, spans.bold, numbered, keyword, spans.length, all_caps, non_latin
+    )
+
+# Pure numbers / separators, or only punctuation
+_JUNK_RE = re.compile(r'[\d\s\.\-_]+|[^\w\s]+')
+
+# Keywords that keep an all-lowercase Latin span as a candidate
+_LATIN_LOWER_ALLOW_RE = re.compile(r'introduction|abstract|summary|conclusion')
+
+@lru_cache(maxsize=8192)
+def is_heading_candidate(text):
+    # Enhanced filtering with multilingual support; length is checked in extract_text_spans.
+    # Purely text-derived, so repeated running headers/footers hit the cache
     # Skip pure numbers, pure punctuation, or very common non-heading patterns
-    if re.fullmatch(r'[\d\s\.\-_]+', text):
-        return False
-    
-    if re.fullmatch(r'[^\w\s]+', text):  # Only punctuation
+    if _JUNK_RE.fullmatch(text):
         return False
     
     # More lenient for non-Latin scripts
@@ -272,42 +482,55 @@ def is_heading_candidate(span):
         return True  # Be more inclusive for non-Latin scripts
     
     # Skip if it's mostly lowercase with no special patterns (for Latin scripts only)
-    if text.islower() and not any(pattern in text.lower() for pattern in ['introduction', 'abstract', 'summary', 'conclusion']):
+    if text.islower() and not _LATIN_LOWER_ALLOW_RE.search(text):
         return False
     
     return True
 
-def assign_heading_level_advanced(spans, font_level_map):
+def assign_heading_level_advanced(candidates, font_level_map, doc_lang="unknown", doc_script="unknown"):
     """
     Advanced heading level assignment using probability scoring with multilingual support
     """
     headings = []
     
-    # Calculate heading probabilities
-    span_scores = []
-    for span in spans:
-        if not is_heading_candidate(span):
-            continue
-        
-        score = calculate_heading_probability(span, font_level_map, spans)
-        span_scores.append((span, score))
-    
-    # Sort by score (descending) and apply threshold
-    span_scores.sort(key=lambda x: x[1], reverse=True)
-    
-    # Dynamic threshold based on score distribution
-    scores = [s[1] for s in span_scores]
-    if scores:
-        # Use 70th percentile as threshold, but minimum of 30
-        threshold = max(30, np.percentile(scores, 70))
-    else:
-        threshold = 30
+    if not candidates:
+        return headings
+    
+    # Running headers/footers repeat the same span on many pages, so detect the
+    # language of and score each distinct (text, font size, bold) once
+    group_of_key = {}
+    representatives = []
+    inverse = np.empty(len(candidates), dtype=np.intp)
+    keys = zip(candidates.text, candidates.font_size.tolist(), candidates.bold.tolist())
+    for i, key in enumerate(keys):
+        group = group_of_key.get(key)
+        if group is None:
+            group = group_of_key[key] = len(representatives)
+            representatives.append(i)
+        inverse[i] = group
+    unique = candidates.take(representatives)
     
-    for span, score in span_scores:
-        if score < threshold:
-            continue
-        
-        text = span["text"]
+    # Calculate heading probabilities
+    unique_langs = [
+        span_language(text, SCRIPT_NAMES[script], doc_lang, doc_script)
+        for text, script in zip(unique.text, unique.script)
+    ]
+    unique_font_levels = lookup_font_levels(unique.font_size, font_level_map)
+    unique_scores = calculate_heading_probability(unique, unique_font_levels, unique_langs)
+    
+    langs = [unique_langs[j] for j in inverse]
+    font_levels = unique_font_levels[inverse]
+    scores = unique_scores[inverse]
+    
+    # Dynamic threshold based on score distribution:
+    # use 70th percentile as threshold, but minimum of 30
+    # (np.percentile selects with a partition, no full sort needed)
+    threshold = max(30, np.percentile(scores, 70))
+    
+    # Visit passing spans in document order
+    for i in np.flatnonzero(scores >= threshold):
+        score = int(scores[i])
+        text = candidates.text[i]
         
         # Determine level from numbering prefix first
         prefix_level = numbering_prefix_level(text)
@@ -315,7 +538,7 @@ def assign_heading_level_advanced(spans, font_level_map):
             level = min(prefix_level, 4)  # Cap at H4
         else:
             # Use font-based level detection but adjust based on score
-            font_level = font_level_map.get(span["font_size"], 5)
+            font_level = int(font_levels[i])
             if score >= 60:
                 level = min(font_level, 1)  # High score = likely H1
             elif score >= 50:
@@ -325,88 +548,93 @@ def assign_heading_level_advanced(spans, font_level_map):
             else:
                 level = min(font_level, 4)  # Lower score = H1-H4
         
-        headings.append({
-            "text": text,
-            "level": level,
-            "page": span["page"],
-            "score": score,
-            "y_pos": span["y_pos"],
-            "lang": span.get("lang", "unknown")
-        })
+        headings.append(Heading(
+            text=text,
+            lower=candidates.lower[i],
+            level=level,
+            page=int(candidates.page[i]),
+            score=score,
+            y_pos=float(candidates.y_pos[i]),
+            lang=langs[i],
+        ))
     
     return headings
 
+# Title-like patterns (multilingual)
+TITLE_RE = _alternation([
+    r'.*overview.*foundation.*level.*extension.*',
+    r'.*foundation.*level.*extension.*',
+    r'.*syllabus.*',
+    r'.*curriculum.*',
+    r'.*guide.*',
+    r'.*概要.*',  # Japanese overview
+    r'.*指南.*',  # Chinese guide
+    r'.*교과.*',  # Korean curriculum
+])
+
 def extract_title(headings):
     # Enhanced title extraction with multilingual support
     if not headings:
         return "Untitled"
     
-    # Look for title-like patterns first (multilingual)
-    title_patterns = [
-        r'.*overview.*foundation.*level.*extension.*',
-        r'.*foundation.*level.*extension.*',
-        r'.*syllabus.*',
-        r'.*curriculum.*',
-        r'.*guide.*',
-        r'.*概要.*',  # Japanese overview
-        r'.*指南.*',  # Chinese guide
-        r'.*교과.*',  # Korean curriculum
-    ]
+    # Prefer higher-scoring headings (ties in document order)
+    headings = sorted(headings, key=lambda h: -h.score)
     
+    # Look for title-like patterns first (multilingual)
     for heading in headings:
-        text_lower = heading["text"].lower()
-        for pattern in title_patterns:
-            if re.search(pattern, text_lower):
-                return heading["text"]
+        if TITLE_RE.search(heading.lower):
+            return heading.text
     
     # Find the first H1 heading
-    h1_headings = [h for h in headings if h["level"] == 1]
+    h1_headings = [h for h in headings if h.level == 1]
     if h1_headings:
         # Sort by page and position
-        h1_headings.sort(key=lambda x: (x["page"], x.get("y_pos", 0)))
-        return h1_headings[0]["text"]
+        h1_headings.sort(key=lambda x: (x.page, x.y_pos))
+        return h1_headings[0].text
     
     # Fallback to first heading
-    return headings[0]["text"] if headings else "Untitled"
+    return headings[0].text if headings else "Untitled"
 
 def build_outline(headings, title):
     # Enhanced outline building with duplicate removal and multilingual support
     outline = []
     seen_texts = set()
+    title_lower = title.lower()
     
     # Sort headings by page, then by y-position (top to bottom)
-    sorted_headings = sorted(headings, key=lambda x: (x["page"], x.get("y_pos", 0)))
+    sorted_headings = sorted(headings, key=lambda x: (x.page, x.y_pos))
     
     for h in sorted_headings:
-        text = h["text"].strip()
-        lang = h.get("lang", "unknown")
+        text = h.text
+        lang = h.lang
         
         # Skip title and duplicates
-        if text.lower() == title.lower() and h["level"] == 1:
+        if h.lower == title_lower and h.level == 1:
             continue
         
         # Create a key for duplicate detection (case insensitive, page-aware)
-        dup_key = (text.lower(), h["page"])
+        dup_key = (h.lower, h.page)
         if dup_key in seen_texts:
             continue
         seen_texts.add(dup_key)
         
         outline.append({
-            "level": f"H{h['level']}",
+            "level": f"H{h.level}",
             "text": text,
-            "page": h["page"],
+            "page": h.page,
             "language": lang
         })
     
     return outline
 
 def process_pdf(pdf_path):
-    spans = extract_text_spans(pdf_path)
-    if not spans:
+    extracted = extract_text_spans(pdf_path)
+    if not len(extracted.font_sizes):
         return {"title": "Untitled", "outline": []}
     
-    font_level_map = analyze_font_hierarchy_statistical(spans)
-    headings = assign_heading_level_advanced(spans, font_level_map)
+    font_level_map = analyze_font_hierarchy_statistical(extracted.font_sizes, extracted.font_counts)
+    doc_lang, doc_script = detect_document_language(extracted)
+    headings = assign_heading_level_advanced(extracted.candidates, font_level_map, doc_lang, doc_script)
     
     title = extract_title(headings)
     outline = build_outline(headings, title)
@@ -416,20 +644,30 @@ def process_pdf(pdf_path):
         "outline": outline
     }
 
+def _process_one(pdf_file, output_dir):
+    try:
+        result = process_pdf(pdf_file)
+        output_path = output_dir / f"{pdf_file.stem}.json"
+        output_path.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+    except Exception as e:
+        print(f"Failed processing {pdf_file.name}: {e}")
+
 def process_pdfs(input_dir, output_dir):
     input_dir = Path(input_dir)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
     pdf_files = list(input_dir.glob("*.pdf"))
-    for pdf_file in tqdm(pdf_files, desc="Processing PDFs"):
-        try:
-            result = process_pdf(pdf_file)
-            output_path = output_dir / f"{pdf_file.stem}.json"
-            with open(output_path, 'w', encoding='utf-8') as f_out:
-                json.dump(result, f_out, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"Failed processing {pdf_file.name}: {e}")
+    if not pdf_files:
+        return
+    
+    # Files are independent, so process them in parallel; workers get the seeded
+    # language detector from the module-level setup
+    workers = min(os.cpu_count() or 1, len(pdf_files))
+    with Pool(workers) as pool:
+        jobs = pool.imap_unordered(partial(_process_one, output_dir=output_dir), pdf_files)
+        for _ in tqdm(jobs, total=len(pdf_files), desc="Processing PDFs"):
+            pass
 
 if __name__ == "__main__":
     import sys